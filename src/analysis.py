@@ -1,21 +1,118 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
 
-def load_processed_data(filename="data/processed/movies_cleaned.csv"):
-    """Loads the cleaned movie data from CSV."""
+# Compact column types for the processed CSV: the low-cardinality text columns become
+# categories. The float columns stay float64 so the printed figures keep every digit,
+# and the counts are nullable integers so a missing value doesn't stop the load
+PROCESSED_DTYPES = {
+    'vote_count': 'Int32',
+    'cast_size': 'Int16',
+    'crew_size': 'Int16',
+    'belongs_to_collection': 'category',
+    'director': 'category',
+    'genres': pd.StringDtype(storage='pyarrow'),
+    'cast': pd.StringDtype(storage='pyarrow'),
+}
+
+
+# Columns used by analyze_movies; the long text columns (overview, tagline, ...) are not needed
+ANALYSIS_COLUMNS = [
+    'id', 'title', 'release_date', 'genres', 'belongs_to_collection', 'budget_musd',
+    'revenue_musd', 'vote_count', 'vote_average', 'popularity', 'runtime', 'cast',
+    'director', 'roi', 'profit', 'is_franchise',
+]
+
+
+# Columns derived by load_processed_data, and the saved column each is computed from
+DERIVED_COLUMNS = {
+    'release_year': 'release_date',
+    'is_franchise': 'belongs_to_collection',
+}
+
+
+def load_processed_data(filename="data/processed/movies_cleaned.csv", columns=None):
+    """
+    Loads the cleaned movie data from CSV or Parquet.
+
+    A CSV is parsed once and cached as a Parquet file next to it, so later runs
+    can skip CSV parsing and date conversion as long as the CSV hasn't changed.
+    A Parquet file written by save_processed_data is read directly.
+
+    Args:
+        filename: Path to the processed CSV or Parquet file.
+        columns: Optional list of columns to return. When reading Parquet or a
+            fresh cache, only these columns (and the ones the derived columns
+            are computed from) are read from disk.
+    """
     filepath = Path(filename)
     if not filepath.exists():
-        raise FileNotFoundError(f"{filename} not found. Please run process_data.py first.")
+        raise FileNotFoundError(
+            f"{filename} not found. Please run process_data.py or 'pipeline.py --step transform' first."
+        )
+
+    is_parquet = filepath.suffix == '.parquet'
+    # Parquet keeps the column types, so a fresh cache can be returned as-is
+    cache_path = filepath.with_suffix('.cache.parquet')
+    if not is_parquet and cache_path.exists() and cache_path.stat().st_mtime >= filepath.stat().st_mtime:
+        # Parquet is columnar, so unrequested columns are never read
+        return pd.read_parquet(cache_path, columns=columns)
     
-    df = pd.read_csv(filepath)
-    # Convert release_date back to datetime objects as CSV loses this info
-    df['release_date'] = pd.to_datetime(df['release_date'])
+    if is_parquet:
+        # Only read the requested columns, swapping derived ones for their source
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(DERIVED_COLUMNS.get(col, col) for col in columns))
+        # Dates are already typed in Parquet; just apply the same compact column types
+        df = pd.read_parquet(filepath, columns=read_columns)
+        df = df.astype({col: dtype for col, dtype in PROCESSED_DTYPES.items() if col in df.columns})
+    else:
+        # PyArrow's multithreaded CSV reader; the date is kept as text here so it
+        # is parsed by to_datetime below exactly as with the default parser
+        df = pd.read_csv(filepath, engine='pyarrow', dtype={**PROCESSED_DTYPES, 'release_date': 'str'})
+        # Convert release_date back to datetime objects as CSV loses this info
+        df['release_date'] = pd.to_datetime(df['release_date'], format='%Y-%m-%d')
     # Extract the year from the release date for easier analysis
-    df['release_year'] = df['release_date'].dt.year
+    # (nullable Int16, so a missing date doesn't turn every year into a float)
+    if 'release_date' in df.columns:
+        df['release_year'] = df['release_date'].dt.year.astype('Int16')
+    # Derive the franchise flag here too, so it is cached along with the data
+    if 'belongs_to_collection' in df.columns:
+        df['is_franchise'] = franchise_mask(df['belongs_to_collection'])
+
+    # Save the typed dataframe (including the derived columns) for the next run
+    if not is_parquet:
+        df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+    if columns is not None:
+        df = df[columns]
     return df
 
 
+def franchise_mask(collection):
+    """
+    Returns a NumPy bool array that is True for movies belonging to a collection.
+
+    A missing (NaN after the CSV round-trip) or empty collection means standalone.
+    """
+    return (collection.notna() & collection.ne("")).to_numpy(dtype=bool)
+
+
+# Rankings printed by analyze_movies, as (metric, ascending, filter_col, filter_val)
+RANKINGS = [
+    ('revenue_musd', False, None, None),            # highest revenue
+    ('budget_musd', False, None, None),             # highest budget
+    ('profit', False, None, None),                  # highest profit
+    ('profit', True, None, None),                   # lowest profit (biggest flops)
+    ('roi', False, 'budget_musd', 10),              # highest ROI (budget >= 10M)
+    ('roi', True, 'budget_musd', 10),               # lowest ROI (budget >= 10M)
+    ('vote_count', False, None, None),              # most voted
+    ('vote_average', False, 'vote_count', 10),      # highest rated (votes >= 10)
+    ('vote_average', True, 'vote_count', 10),       # lowest rated (votes >= 10)
+    ('popularity', False, None, None),              # most popular
+]
+
+
 def rank_movies(df, metric, ascending=False, top_n=5, filter_col=None, filter_val=None):
     """
     Ranks movies based on a specific metric.
@@ -28,75 +125,191 @@ def rank_movies(df, metric, ascending=False, top_n=5, filter_col=None, filter_va
         filter_col: Optional column to filter by before ranking.
         filter_val: Minimum value for the filter column.
     """
-    data = df.copy()
-    # Apply filter if specified (e.g., only consider movies with budget > 10M)
-    if filter_col:
-        data = data[data[filter_col] >= filter_val]
-    
-    # Sort the data and take the top N rows
-    ranked = data.sort_values(metric, ascending=ascending).head(top_n)
-    # Return only the title and the metric column
-    return ranked[['title', metric]]
+    return rank_all(df, [(metric, ascending, filter_col, filter_val)], top_n=top_n)[0]
+
+
+def rank_all(df, rankings=RANKINGS, top_n=5):
+    """
+    Runs several rankings over the same dataframe in a single pass.
+
+    Each metric column and each filter mask is converted to NumPy only once and
+    shared between rankings, and every ranking picks its top N rows with
+    np.argpartition instead of sorting the whole column.
+
+    Args:
+        df: The dataframe containing movie data.
+        rankings: List of (metric, ascending, filter_col, filter_val) tuples.
+        top_n: Number of top movies to return for each ranking.
+    """
+    columns = {}
+    masks = {}
+    results = []
+    for metric, ascending, filter_col, filter_val in rankings:
+        if metric not in columns:
+            columns[metric] = df[metric].to_numpy(dtype=float, na_value=np.nan)
+        values = columns[metric]
+
+        # Missing values are never ranked
+        rows = np.flatnonzero(~np.isnan(values))
+        # Apply filter if specified (e.g., only consider movies with budget > 10M)
+        if filter_col:
+            if (filter_col, filter_val) not in masks:
+                # Missing values (NA) become NaN, which never passes the filter
+                filter_values = df[filter_col].to_numpy(dtype=float, na_value=np.nan)
+                masks[(filter_col, filter_val)] = filter_values >= filter_val
+            rows = rows[masks[(filter_col, filter_val)][rows]]
+
+        # Negate for descending order so the best rows always have the smallest score
+        scores = values[rows] if ascending else -values[rows]
+        # Partition out the top N candidates, then sort only those few rows
+        top = np.argpartition(scores, top_n)[:top_n] if len(rows) > top_n else np.arange(len(rows))
+        top = top[np.argsort(scores[top], kind='stable')]
+        results.append(df.iloc[rows[top]][['title', metric]])
+    return results
+
+
+def explode_names(df, col):
+    """
+    Splits a pipe-separated column into a long-form frame with one name per row.
+
+    The names are stored as a category so lookups compare integer codes
+    instead of scanning strings.
+    """
+    long_df = df[['id']].assign(name=df[col].str.split('|')).explode('name')
+    long_df['name'] = long_df['name'].astype('category')
+    return long_df
+
+
+def ids_with_name(long_df, name):
+    """Returns the set of movie IDs whose exploded names include the given name."""
+    return set(long_df.loc[long_df['name'] == name, 'id'])
+
+
+def one_hot_names(df, col):
+    """
+    Builds a bool matrix (rows = movies, columns = names) from a pipe-separated column.
+
+    Meant for low-cardinality columns such as genres: combining conditions is
+    then just a bitwise AND of columns. High-cardinality columns like cast
+    should use explode_names instead, since this matrix is dense.
+    """
+    return df[col].str.get_dummies(sep='|').astype(bool)
+
+
+def name_flag(flags, name):
+    """Returns the bool column for a name in a one-hot matrix (all False if the name never occurs)."""
+    if name in flags.columns:
+        return flags[name].to_numpy()
+    return np.zeros(len(flags), dtype=bool)
+
+
+def aggregate_groups(df, key, **aggs):
+    """
+    Aggregates columns per group without going through pandas' groupby.
+
+    Rows are sorted by the group key once, so every group becomes a contiguous
+    run and its sum is a single np.add.reduceat over the run boundaries.
+    Categorical keys are grouped by their integer codes, and only categories
+    that actually occur are returned (like groupby with observed=True).
+    Rows with a missing key are skipped, just like groupby does.
+
+    Args:
+        df: The dataframe containing movie data.
+        key: The column to group by (e.g., 'director').
+        **aggs: Output column name -> (input column, 'count' | 'sum' | 'mean').
+    """
+    column = df[key]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Sort integer codes instead of strings; a code of -1 marks a missing key
+        keys = column.cat.codes.to_numpy()
+        rows = np.flatnonzero(keys >= 0)
+    else:
+        keys = column.to_numpy()
+        rows = np.flatnonzero(pd.notna(keys))
+    # Row positions with a valid key, ordered so equal keys sit next to each other
+    rows = rows[np.argsort(keys[rows], kind='stable')]
+    if len(rows) == 0:
+        # Keep the same column types as a non-empty result, so nlargest() etc. still work
+        return pd.DataFrame(
+            {name: np.array([], dtype=np.int64 if func == 'count' else float) for name, (col, func) in aggs.items()},
+            index=pd.Index([], name=key),
+        )
+
+    # np.unique on the sorted keys gives the start index of each run
+    group_keys, starts = np.unique(keys[rows], return_index=True)
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Map the codes back to their category labels
+        group_keys = column.cat.categories[group_keys]
+
+    result = {}
+    for name, (col, func) in aggs.items():
+        values = df[col].to_numpy()[rows]
+        # Missing values are left out of counts, sums and means
+        valid = pd.notna(values)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        if func == 'count':
+            result[name] = counts
+            continue
+
+        totals = np.add.reduceat(np.where(valid, values, 0).astype(float), starts)
+        if func == 'sum':
+            result[name] = totals
+        else:
+            result[name] = np.divide(totals, counts, out=np.full(len(totals), np.nan), where=counts > 0)
+
+    return pd.DataFrame(result, index=pd.Index(group_keys, name=key))
+
+
+def select_sorted(df, mask, sort_col, columns, ascending=True):
+    """
+    Returns the rows matching a boolean mask, sorted by one column.
+
+    Only the matching positions are sorted (with NumPy), and the requested
+    columns are taken in one step instead of copying the filtered frame first.
+    """
+    rows = np.flatnonzero(mask)
+    values = df[sort_col].to_numpy(dtype=float, na_value=np.nan)[rows]
+    # Negating gives a descending order while keeping missing values last
+    order = np.argsort(values if ascending else -values, kind='stable')
+    return df.iloc[rows[order], df.columns.get_indexer(columns)]
 
 
 def analyze_movies(df):
     """
     Performs various analyses on the movie dataset.
     """
-    # 1. Financial Analysis
-    # highest revenue
-    print(rank_movies(df, 'revenue_musd'))
-    
-    # highest budget
-    print(rank_movies(df, 'budget_musd'))
-    
-    # highest profit
-    print(rank_movies(df, 'profit'))
-    
-    # lowest profit (biggest flops)
-    print(rank_movies(df, 'profit', ascending=True))
-    
-    # highest ROI (Return on Investment) - filtering for significant budget
-    print(rank_movies(df, 'roi', filter_col='budget_musd', filter_val=10))
-    
-    # lowest ROI (budget >= 10M)
-    print(rank_movies(df, 'roi', ascending=True, filter_col='budget_musd', filter_val=10))
-    
-    # 2. Popularity and Ratings
-    # most voted
-    print(rank_movies(df, 'vote_count'))
-    
-    # highest rated (filtering for at least 10 votes to avoid outliers)
-    print(rank_movies(df, 'vote_average', filter_col='vote_count', filter_val=10))
-    
-    # lowest rated (votes >= 10)
-    print(rank_movies(df, 'vote_average', ascending=True, filter_col='vote_count', filter_val=10))
-    
-    # most popular according to TMDB popularity score
-    print(rank_movies(df, 'popularity'))
+    # 1. Financial Analysis and 2. Popularity and Ratings
+    # All rankings are computed together so the columns are only read once
+    for ranking in rank_all(df):
+        print(ranking)
     
     # 3. Specific Queries
+    # Encode the pipe-separated columns once: genres as a one-hot matrix and
+    # cast (many distinct names) as an exploded long-form frame
+    genre_flags = one_hot_names(df, 'genres')
+    cast_long = explode_names(df, 'cast')
+
     # finding sci-fi action movies with Bruce Willis
-    mask_scifi = df['genres'].str.contains('Science Fiction', na=False)
-    mask_action = df['genres'].str.contains('Action', na=False)
-    mask_bruce = df['cast'].str.contains('Bruce Willis', na=False)
+    mask_genres = name_flag(genre_flags, 'Science Fiction') & name_flag(genre_flags, 'Action')
+    bruce_ids = ids_with_name(cast_long, 'Bruce Willis')
     
-    # Combine masks to find movies matching all criteria
-    bruce_movies = df[mask_scifi & mask_action & mask_bruce]
-    bruce_movies = bruce_movies.sort_values('vote_average', ascending=False)
-    print(bruce_movies[['title', 'vote_average', 'release_date']])
+    # Combine the masks to find movies matching all criteria
+    mask_bruce = mask_genres & df['id'].isin(bruce_ids).to_numpy()
+    bruce_movies = select_sorted(df, mask_bruce, 'vote_average', ['title', 'vote_average', 'release_date'], ascending=False)
+    print(bruce_movies)
     
     # Uma Thurman and Quentin Tarantino movies
-    mask_uma = df['cast'].str.contains('Uma Thurman', na=False)
-    mask_qt = df['director'].str.contains('Quentin Tarantino', na=False)
+    uma_ids = ids_with_name(cast_long, 'Uma Thurman')
+    mask_qt = df['director'] == 'Quentin Tarantino'
     
-    uma_qt_movies = df[mask_uma & mask_qt]
-    uma_qt_movies = uma_qt_movies.sort_values('runtime')
-    print(uma_qt_movies[['title', 'runtime', 'release_date']])
+    mask_uma_qt = (df['id'].isin(uma_ids) & mask_qt).to_numpy()
+    uma_qt_movies = select_sorted(df, mask_uma_qt, 'runtime', ['title', 'runtime', 'release_date'])
+    print(uma_qt_movies)
     
     # 4. Franchise Analysis
-    # Create a boolean column for franchise movies
-    df['is_franchise'] = df['belongs_to_collection'].apply(lambda x: True if x else False)
+    # Create a boolean column for franchise movies, unless the loader already did
+    if 'is_franchise' not in df.columns:
+        df['is_franchise'] = franchise_mask(df['belongs_to_collection'])
     
     # Compare average stats for franchise vs standalone movies
     franchise_stats = df.groupby('is_franchise').agg({
@@ -111,32 +324,36 @@ def analyze_movies(df):
     
     # Identify most successful franchises
     franchise_df = df[df['is_franchise']]
-    franchise_df = franchise_df.groupby('belongs_to_collection').agg({
-        'title': 'count',
-        'budget_musd': ['sum', 'mean'],
-        'revenue_musd': ['sum', 'mean'],
-        'vote_average': 'mean'
-    })
-    franchise_df.columns = ['movie_count', 'total_budget', 'mean_budget', 'total_revenue', 'mean_revenue', 'mean_rating']
-    print(franchise_df.sort_values('total_revenue', ascending=False).head(5))
+    franchise_df = aggregate_groups(
+        franchise_df, 'belongs_to_collection',
+        movie_count=('title', 'count'),
+        total_budget=('budget_musd', 'sum'),
+        mean_budget=('budget_musd', 'mean'),
+        total_revenue=('revenue_musd', 'sum'),
+        mean_revenue=('revenue_musd', 'mean'),
+        mean_rating=('vote_average', 'mean'),
+    )
+    print(franchise_df.nlargest(5, 'total_revenue'))
     
     # 5. Director Analysis
-    director_df = df.groupby('director').agg({
-        'title': 'count',
-        'revenue_musd': 'sum',
-        'vote_average': 'mean'
-    })
-    director_df.columns = ['movie_count', 'total_revenue', 'mean_rating']
+    director_df = aggregate_groups(
+        df, 'director',
+        movie_count=('title', 'count'),
+        total_revenue=('revenue_musd', 'sum'),
+        mean_rating=('vote_average', 'mean'),
+    )
     
     # remove empty director names
     if "" in director_df.index:
         director_df = director_df.drop("")
     
-    print(director_df.sort_values('total_revenue', ascending=False).head(5))
+    print(director_df.nlargest(5, 'total_revenue'))
 
     return franchise_stats, franchise_df, director_df
 
 
 if __name__ == "__main__":
-    df = load_processed_data()
+    from process_data import find_processed_data
+
+    df = load_processed_data(find_processed_data(), columns=ANALYSIS_COLUMNS)
     franchise_stats, franchise_df, director_df = analyze_movies(df)
@@ -1,8 +1,14 @@
 import os
+import time
+import hashlib
 import requests
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load environment variables from .env file
 # This is important to keep sensitive information like API keys secure
@@ -12,10 +18,76 @@ load_dotenv()
 API_KEY = os.getenv('TMDB_API_KEY')
 BASE_URL = "https://api.themoviedb.org/3"
 
-def fetch_movie_details(movie_id):
+# Number of movies fetched at the same time (requests are I/O bound, so threads work well)
+MAX_WORKERS = 16
+
+# Each TMDB response is cached on disk so repeated runs don't hit the API again
+CACHE_DIR = Path("data") / "raw" / ".tmdb_cache"
+# Movie details rarely change, so a cached response is reused for 30 days
+CACHE_TTL = timedelta(days=30)
+# Discover results follow new releases and box office changes, so they expire after a day
+DISCOVER_CACHE_TTL = timedelta(days=1)
+
+def load_cached_movie(movie_id, ttl=CACHE_TTL, cache_dir=CACHE_DIR):
+    """
+    Returns the cached TMDB response for a movie ID.
+
+    Returns None if there is no cached response or it is older than ttl.
+    Pass ttl=None to accept a cached response of any age.
+    """
+    path = Path(cache_dir) / f"{movie_id}.json"
+    if not path.exists():
+        return None
+    # The file's modification time tells us when the response was fetched
+    if ttl is not None and time.time() - path.stat().st_mtime > ttl.total_seconds():
+        return None
+    return orjson.loads(path.read_bytes())
+
+def save_cached_movie(movie_id, data, cache_dir=CACHE_DIR):
+    """Saves a TMDB response to the on-disk cache."""
+    path = Path(cache_dir) / f"{movie_id}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so a crash never leaves a half-written cache entry
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_bytes(orjson.dumps(data))
+    tmp_path.replace(path)
+
+def create_session(pool_size=MAX_WORKERS):
+    """
+    Creates a requests Session that reuses connections and retries failed requests.
+    """
+    session = requests.Session()
+    # Retry rate-limited (429) and server-side errors with exponential backoff,
+    # waiting as long as TMDB asks for in its Retry-After header when it sends one
+    retries = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+    )
+    # Keep one pooled connection per worker thread so they are reused between requests
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount('https://', adapter)
+    return session
+
+# Shared session for calls that don't pass one in, so even one-off fetches reuse
+# the same HTTPS connection instead of opening a new one every time
+SESSION = create_session()
+
+def fetch_movie_details(movie_id, session=None, force_refresh=False):
     """
     Fetches details for a specific movie ID.
+
+    Pass a shared session to reuse HTTP connections across calls.
+    Responses are served from the on-disk cache while they are fresh,
+    unless force_refresh is True.
     """
+    # Use the cached response if we fetched this movie recently
+    if not force_refresh:
+        cached = load_cached_movie(movie_id)
+        if cached is not None:
+            return cached
+
     # Check if the API key is available
     if not API_KEY:
         raise ValueError("TMDB_API_KEY not found in environment variables.")
@@ -24,40 +96,104 @@ def fetch_movie_details(movie_id):
     # We append 'credits' to the response to get cast and crew information
     url = f"{BASE_URL}/movie/{movie_id}?api_key={API_KEY}&language=en-US&append_to_response=credits"
     try:
-        # Send a GET request to the API
-        response = requests.get(url)
+        # Send a GET request to the API, falling back to the module-wide session
+        http = session if session is not None else SESSION
+        response = http.get(url, timeout=10)
         # Raise an exception if the request was unsuccessful (e.g., 404 or 500 error)
         response.raise_for_status()
-        # Return the JSON response
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        # Parse the raw body bytes with orjson (skips decoding them to a str first)
+        data = orjson.loads(response.content)
+        # Cache and return the JSON response
+        save_cached_movie(movie_id, data)
+        return data
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
         # Print an error message if something goes wrong
         print(f"Error fetching movie {movie_id}: {e}")
-        return None
+        # Fall back to an expired cached response rather than losing the movie
+        return load_cached_movie(movie_id, ttl=None)
 
-def fetch_specific_movies(movie_ids):
+def fetch_specific_movies(movie_ids, max_workers=MAX_WORKERS, force_refresh=False):
     """
     Fetches data for a list of movie IDs.
+
+    Requests run concurrently on a thread pool sharing one pooled session.
+    The returned movies keep the order of movie_ids.
+    Set force_refresh to ignore the on-disk cache and re-download every movie.
+    """
+    results = [None] * len(movie_ids)
+    print(f"Fetching {len(movie_ids)} movies using {max_workers} workers...")
+    with create_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Remember each future's position so results can be put back in input order
+        futures = {
+            executor.submit(fetch_movie_details, movie_id, session, force_refresh): i
+            for i, movie_id in enumerate(movie_ids)
+        }
+        # Report progress as soon as each request finishes, whatever its position
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            results[i] = future.result()
+            print(f"Fetched movie {done}/{len(movie_ids)}: ID {movie_ids[i]}")
+
+    # Keep only the movies that were successfully fetched
+    return [data for data in results if data]
+
+def fetch_movies_discover(filter_params=None, pages=1, session=None, force_refresh=False):
     """
+    Fetches movie summaries from TMDB's /discover/movie endpoint.
+
+    Each page returns up to 20 movies in a single request, so this is a much
+    cheaper way to find movies than fetching them one ID at a time.
+    filter_params holds the discover filters (e.g. {'sort_by': 'revenue.desc'}).
+    Pages are cached on disk for DISCOVER_CACHE_TTL, unless force_refresh is True.
+    The summaries have no credits, so pass their IDs to fetch_specific_movies
+    for the movies that need full details.
+    """
+    filter_params = filter_params or {}
+    # Cache each page under a hash of its filters, so different queries don't collide
+    query_key = hashlib.sha1(orjson.dumps(filter_params, option=orjson.OPT_SORT_KEYS)).hexdigest()[:16]
+
+    http = session if session is not None else SESSION
     movies = []
-    # Loop through each movie ID in the list
-    for i, movie_id in enumerate(movie_ids):
-        print(f"Fetching movie {i+1}/{len(movie_ids)}: ID {movie_id}")
-        # Fetch details for the current movie ID
-        data = fetch_movie_details(movie_id)
-        # If data was successfully fetched, add it to the list
-        if data:
-            movies.append(data)
+    for page in range(1, pages + 1):
+        cache_key = f"discover_{query_key}_{page}"
+        data = None if force_refresh else load_cached_movie(cache_key, ttl=DISCOVER_CACHE_TTL)
+        if data is None:
+            # Check if the API key is available
+            if not API_KEY:
+                raise ValueError("TMDB_API_KEY not found in environment variables.")
+            params = {'api_key': API_KEY, 'language': 'en-US', **filter_params, 'page': page}
+            try:
+                response = http.get(f"{BASE_URL}/discover/movie", params=params, timeout=10)
+                response.raise_for_status()
+                data = orjson.loads(response.content)
+            except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+                print(f"Error fetching discover page {page}: {e}")
+                # Fall back to an expired cached page rather than losing its movies
+                data = load_cached_movie(cache_key, ttl=None)
+                if data is None:
+                    break
+            else:
+                save_cached_movie(cache_key, data)
+        # Flatten each page's results into one list
+        movies.extend(data.get('results', []))
+        # Stop early once we've run out of pages
+        if page >= data.get('total_pages', 0):
+            break
+
     return movies
 
-def save_raw_data(data, filename=Path("data") / "raw" / "movies.json"):
-    """Saves the fetched data to a JSON file."""
+def save_raw_data(data, filename=Path("data") / "raw" / "movies.json", debug=False):
+    """
+    Saves the fetched data to a JSON file.
+
+    The file is written compactly; pass debug=True to indent it for reading.
+    """
     path = Path(filename)
     # Create the directory if it doesn't exist
     path.parent.mkdir(parents=True, exist_ok=True)
-    # Open the file in write mode and save the data as JSON
-    with path.open('w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4)
+    # orjson serializes straight to UTF-8 bytes, much faster than the json module
+    option = orjson.OPT_INDENT_2 if debug else 0
+    path.write_bytes(orjson.dumps(data, option=option))
     print(f"Saved {len(data)} movies to {path}")
 
 if __name__ == "__main__":
@@ -14,10 +14,9 @@ import argparse
 from pathlib import Path
 
 # Import functions from other modules
-from fetch_data import fetch_specific_movies, save_raw_data
-from process_data import load_raw_data, process_data, save_processed_data
-from analysis import load_processed_data, analyze_movies
-from visualization import create_all_visualizations
+# The later steps import their modules inside the step functions, so running
+# only the extract step does not pay for loading pandas, matplotlib and seaborn
+from fetch_data import MAX_WORKERS, fetch_movies_discover, fetch_specific_movies, save_raw_data
 
 
 # Default movie IDs from assignment
@@ -28,13 +27,17 @@ DEFAULT_MOVIE_IDS = [
 ]
 
 
-def run_extract(movie_ids=None, skip_if_exists=False):
+def run_extract(movie_ids=None, skip_if_exists=False, workers=MAX_WORKERS, force_refresh=False, discover_pages=None):
     """
     Step 1: Extract - Fetch movie data from TMDB API.
     
     Args:
         movie_ids: List of TMDB movie IDs to fetch. Uses defaults if None.
         skip_if_exists: If True, skip fetching if raw data already exists.
+        workers: Number of movies to fetch concurrently.
+        force_refresh: If True, ignore cached API responses and re-download.
+        discover_pages: If set, fetch the IDs from this many pages of TMDB's
+            highest-grossing movies instead of using movie_ids.
     """
     print("\n" + "=" * 60)
     print("STEP 1: EXTRACT - Fetching movie data from TMDB API")
@@ -47,12 +50,21 @@ def run_extract(movie_ids=None, skip_if_exists=False):
         print(f"Raw data already exists at {raw_data_path}. Skipping fetch.")
         return True
     
+    # Find movies through the discover endpoint (20 per request) when asked to
+    if discover_pages:
+        print(f"Discovering movies from {discover_pages} page(s) of top-grossing titles...")
+        discovered = fetch_movies_discover(
+            {'sort_by': 'revenue.desc'}, pages=discover_pages, force_refresh=force_refresh
+        )
+        # The summaries lack credits, so their IDs are fetched in full below
+        movie_ids = [movie['id'] for movie in discovered]
+    
     # Use default IDs if none provided
     if movie_ids is None:
         movie_ids = DEFAULT_MOVIE_IDS
     
     print(f"Fetching {len(movie_ids)} movies...")
-    movies_data = fetch_specific_movies(movie_ids)
+    movies_data = fetch_specific_movies(movie_ids, max_workers=workers, force_refresh=force_refresh)
     
     if movies_data:
         save_raw_data(movies_data)
@@ -63,25 +75,31 @@ def run_extract(movie_ids=None, skip_if_exists=False):
         return False
 
 
-def run_transform():
+def run_transform(data_format='parquet', verbose=False):
     """
     Step 2: Transform - Clean and process the raw movie data.
+    
+    Args:
+        data_format: File format for the processed data ('parquet' or 'csv').
+        verbose: If True, print the top values of each extracted column.
     """
     print("\n" + "=" * 60)
     print("STEP 2: TRANSFORM - Processing and cleaning data")
     print("=" * 60)
     
     try:
+        from process_data import PROCESSED_DATA_PATHS, load_raw_data, process_data, save_processed_data
+
         print("Loading raw data...")
         df_raw = load_raw_data()
         print(f"Loaded {len(df_raw)} raw movie records.")
         
         print("Processing data...")
-        df_clean = process_data(df_raw)
+        df_clean = process_data(df_raw, verbose=verbose)
         print(f"Processed data contains {len(df_clean)} records.")
         
         print("Saving processed data...")
-        save_processed_data(df_clean)
+        save_processed_data(df_clean, PROCESSED_DATA_PATHS[data_format])
         
         return True
     except FileNotFoundError as e:
@@ -93,16 +111,24 @@ def run_transform():
         return False
 
 
-def run_analyze():
+def run_analyze(data_format='parquet'):
     """
     Step 3a: Analyze - Run analysis on the processed data.
+    
+    Args:
+        data_format: File format of the processed data ('parquet' or 'csv').
     """
     print("\n" + "=" * 60)
     print("STEP 3a: ANALYZE - Running movie analysis")
     print("=" * 60)
     
     try:
-        df = load_processed_data()
+        from process_data import find_processed_data
+        from analysis import ANALYSIS_COLUMNS, load_processed_data, analyze_movies
+
+        # Falls back to the other format if that one was written more recently
+        # (a fresh checkout only ships the CSV)
+        df = load_processed_data(find_processed_data(data_format), columns=ANALYSIS_COLUMNS)
         print(f"Loaded {len(df)} processed movie records for analysis.\n")
         
         franchise_stats, franchise_df, director_df = analyze_movies(df)
@@ -118,20 +144,28 @@ def run_analyze():
         return False
 
 
-def run_visualize():
+def run_visualize(data_format='parquet', image_format='png', plot_workers=1):
     """
     Step 3b: Visualize - Generate visualizations from the processed data.
+    
+    Args:
+        data_format: File format of the processed data ('parquet' or 'csv').
+        image_format: File format of the charts ('png', 'webp' or 'svg').
+        plot_workers: Number of processes drawing charts in parallel (1 draws them in turn).
     """
     print("\n" + "=" * 60)
     print("STEP 3b: VISUALIZE - Creating visualizations")
     print("=" * 60)
     
     try:
-        from visualization import load_processed_data as load_viz_data
-        df = load_viz_data()
+        from process_data import find_processed_data
+        from visualization import VISUALIZATION_COLUMNS, load_processed_data, create_all_visualizations
+
+        # Falls back to the other format if that one was written more recently
+        df = load_processed_data(find_processed_data(data_format), columns=VISUALIZATION_COLUMNS)
         print(f"Loaded {len(df)} records for visualization.\n")
         
-        create_all_visualizations(df)
+        create_all_visualizations(df, workers=plot_workers, image_format=image_format)
         
         print("Visualizations saved to data/processed/ directory.")
         return True
@@ -144,13 +178,30 @@ def run_visualize():
         return False
 
 
-def run_full_pipeline(movie_ids=None, skip_fetch=False):
+def run_full_pipeline(
+    movie_ids=None,
+    skip_fetch=False,
+    workers=MAX_WORKERS,
+    force_refresh=False,
+    data_format='parquet',
+    verbose=False,
+    image_format='png',
+    plot_workers=1,
+    discover_pages=None,
+):
     """
     Run the complete ETL pipeline.
     
     Args:
         movie_ids: Optional list of movie IDs to fetch.
         skip_fetch: If True, skip the extract step (use existing raw data).
+        workers: Number of movies to fetch concurrently.
+        force_refresh: If True, ignore cached API responses and re-download.
+        data_format: File format for the processed data ('parquet' or 'csv').
+        verbose: If True, print the top values of each extracted column.
+        image_format: File format of the charts ('png', 'webp' or 'svg').
+        plot_workers: Number of processes drawing charts in parallel (1 draws them in turn).
+        discover_pages: If set, fetch this many pages of top-grossing movies instead of movie_ids.
     """
     print("\n" + "#" * 60)
     print("#" + " " * 18 + "MOVIE DATA PIPELINE" + " " * 19 + "#")
@@ -158,24 +209,26 @@ def run_full_pipeline(movie_ids=None, skip_fetch=False):
     
     # Step 1: Extract
     if not skip_fetch:
-        if not run_extract(movie_ids):
+        if not run_extract(
+            movie_ids, workers=workers, force_refresh=force_refresh, discover_pages=discover_pages
+        ):
             print("\nPipeline stopped: Extract step failed.")
             return False
     else:
         print("\n[Skipping extract step - using existing raw data]")
     
     # Step 2: Transform
-    if not run_transform():
+    if not run_transform(data_format, verbose=verbose):
         print("\nPipeline stopped: Transform step failed.")
         return False
     
     # Step 3a: Analyze
-    if not run_analyze():
+    if not run_analyze(data_format):
         print("\nPipeline stopped: Analysis step failed.")
         return False
     
     # Step 3b: Visualize
-    if not run_visualize():
+    if not run_visualize(data_format, image_format, plot_workers):
         print("\nPipeline stopped: Visualization step failed.")
         return False
     
@@ -186,6 +239,14 @@ def run_full_pipeline(movie_ids=None, skip_fetch=False):
     return True
 
 
+def positive_int(value):
+    """argparse type for options that need a count of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
 def main():
     """Main entry point with command-line argument parsing."""
     parser = argparse.ArgumentParser(
@@ -199,6 +260,13 @@ Examples:
   python pipeline.py --step transform   # Run only transform step
   python pipeline.py --step analyze     # Run only analyze step
   python pipeline.py --step visualize   # Run only visualize step
+  python pipeline.py --workers 4        # Fetch at most 4 movies at a time
+  python pipeline.py --force-refresh    # Re-download movies even if cached
+  python pipeline.py --data-format csv  # Write/read the processed data as CSV
+  python pipeline.py --verbose          # Also inspect the extracted columns
+  python pipeline.py --image-format svg # Save the charts as SVG instead of PNG
+  python pipeline.py --plot-workers 5   # Draw the charts in 5 parallel processes
+  python pipeline.py --discover 3       # Fetch the top 60 grossing movies instead
         """
     )
     
@@ -215,18 +283,74 @@ Examples:
         help='Run a specific pipeline step (default: all)'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=positive_int,
+        default=MAX_WORKERS,
+        help=f'Number of movies to fetch concurrently (default: {MAX_WORKERS})'
+    )
+    
+    parser.add_argument(
+        '--force-refresh',
+        action='store_true',
+        help='Ignore cached TMDB responses and fetch every movie again'
+    )
+    
+    parser.add_argument(
+        '--data-format',
+        choices=['parquet', 'csv'],
+        default='parquet',
+        help='File format for the processed data (default: parquet)'
+    )
+    
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Print the top values of each extracted column during the transform step'
+    )
+    
+    parser.add_argument(
+        '--image-format',
+        choices=['png', 'webp', 'svg'],
+        default='png',
+        help='File format for the generated charts (default: png)'
+    )
+    
+    parser.add_argument(
+        '--plot-workers',
+        type=positive_int,
+        default=1,
+        help='Number of processes drawing the charts in parallel (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--discover',
+        type=positive_int,
+        metavar='PAGES',
+        help='Fetch this many pages (20 movies each) of top-grossing movies instead of the default IDs'
+    )
+    
     args = parser.parse_args()
     
     if args.step == 'all':
-        run_full_pipeline(skip_fetch=args.skip_fetch)
+        run_full_pipeline(
+            skip_fetch=args.skip_fetch,
+            workers=args.workers,
+            force_refresh=args.force_refresh,
+            data_format=args.data_format,
+            verbose=args.verbose,
+            image_format=args.image_format,
+            plot_workers=args.plot_workers,
+            discover_pages=args.discover,
+        )
     elif args.step == 'extract':
-        run_extract()
+        run_extract(workers=args.workers, force_refresh=args.force_refresh, discover_pages=args.discover)
     elif args.step == 'transform':
-        run_transform()
+        run_transform(args.data_format, verbose=args.verbose)
     elif args.step == 'analyze':
-        run_analyze()
+        run_analyze(args.data_format)
     elif args.step == 'visualize':
-        run_visualize()
+        run_visualize(args.data_format, args.image_format, args.plot_workers)
 
 
 if __name__ == "__main__":
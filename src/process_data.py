@@ -1,8 +1,28 @@
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
-import json
+import orjson
 from pathlib import Path
 
+# Column types for the numeric TMDB fields, applied when loading.
+# Nullable integer types keep whole numbers exact while still allowing missing values.
+# The floats stay float64 so the processed CSV keeps their full precision.
+RAW_DTYPES = {
+    'id': 'Int64',
+    'budget': 'Int64',
+    'revenue': 'Int64',
+    'runtime': 'Int16',
+    'vote_count': 'Int32',
+    'vote_average': 'float64',
+    'popularity': 'float64',
+}
+
+# Where the processed data is saved, for each supported format
+PROCESSED_DATA_PATHS = {
+    'parquet': Path("data/processed/movies_cleaned.parquet"),
+    'csv': Path("data/processed/movies_cleaned.csv"),
+}
+
 def load_raw_data(filename="data/raw/movies.json"):
     """Loads raw data from JSON file."""
     filepath = Path(filename)
@@ -10,15 +30,28 @@ def load_raw_data(filename="data/raw/movies.json"):
     if not filepath.exists():
         raise FileNotFoundError(f"{filename} not found. Please run fetch_data.py first.")
     
-    # Open the file and load the JSON data
-    with filepath.open('r', encoding='utf-8') as f:
-        data = json.load(f)
+    # Parse the raw bytes with orjson, which is much faster than the json module
+    data = orjson.loads(filepath.read_bytes())
     # Convert the list of dictionaries to a pandas DataFrame
-    return pd.DataFrame(data)
+    df = pd.DataFrame(data)
 
-def process_data(df) -> DataFrame:
+    # Ensure numeric columns are actually numeric: a missing column defaults to 0
+    # and values that aren't numbers are coerced to NaN
+    numeric = {}
+    for col, dtype in RAW_DTYPES.items():
+        values = pd.to_numeric(df.get(col, pd.Series(0, index=df.index)), errors='coerce')
+        try:
+            numeric[col] = values.astype(dtype)
+        except (TypeError, ValueError):
+            # Non-integral or out-of-range values can't be stored exactly as integers
+            numeric[col] = values
+    return df.assign(**numeric)
+
+def process_data(df, verbose=False) -> DataFrame:
     """
     Cleans and transforms the movie dataframe according to assignment requirements.
+
+    Set verbose to print the most common values of each extracted column.
     """
     # 1. Drop irrelevant columns
     # These columns are not needed for our analysis
@@ -27,73 +60,82 @@ def process_data(df) -> DataFrame:
     
     # 2-3. Extract names from JSON-like columns
     # Many columns contain lists of dictionaries (e.g., genres), we just want the names
-    def extract_names(x):
-        if isinstance(x, list):
-            # Join the names with a pipe separator
-            return "|".join([i['name'] for i in x if 'name' in i])
-        return ""
-
     json_cols = ['genres', 'belongs_to_collection', 'production_countries', 'production_companies', 'spoken_languages']
+    extracted = {}
     for col in json_cols:
         if col in df.columns:
+            # Plain list comprehensions over the raw values skip pandas' apply overhead
+            values = df[col].to_numpy()
             # Special handling for 'belongs_to_collection' which is a dict, not a list
             if col == 'belongs_to_collection':
-                 df[col] = df[col].apply(lambda x: x['name'] if isinstance(x, dict) and 'name' in x else "")
+                extracted[col] = [x['name'] if isinstance(x, dict) and 'name' in x else "" for x in values]
             else:
-                df[col] = df[col].apply(extract_names)
+                # Join the names with a pipe separator
+                extracted[col] = ["|".join([i['name'] for i in x if 'name' in i]) if isinstance(x, list) else "" for x in values]
+    # Replace all the extracted columns in one step
+    df = df.assign(**extracted)
+
+    # Store repetitive text columns compactly: categories for the low-cardinality
+    # ones and Arrow-backed strings for the long free-text ones
+    compact_types = {
+        'original_language': 'category',
+        'genres': 'category',
+        'production_countries': 'category',
+        'belongs_to_collection': 'category',
+        'overview': 'string[pyarrow]',
+        'tagline': 'string[pyarrow]',
+    }
+    df = df.astype({col: dtype for col, dtype in compact_types.items() if col in df.columns})
                 
     # 4. Inspect extracted columns for anomalies
-    print("\n--- Inspecting Extracted Columns ---")
-    for col in json_cols:
-        if col in df.columns:
-            print(f"\nTop 5 values for {col}:")
-            print(df[col].value_counts().head(5))
+    # Only when asked for, since counting values is wasted work in a normal run
+    if verbose:
+        print("\n--- Inspecting Extracted Columns ---")
+        for col in json_cols:
+            if col in df.columns:
+                print(f"\nTop 5 values for {col}:")
+                print(df[col].value_counts().head(5))
 
     # 5. Convert column datatypes
-    # Ensure numeric columns are actually numeric, coercing errors to NaN
-    numeric_cols = ['budget', 'id', 'popularity', 'revenue', 'vote_average', 'vote_count', 'runtime']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df.get(col, 0), errors='coerce')
-        
+    # The numeric columns are already typed by load_raw_data (see RAW_DTYPES)
     # Convert release_date to datetime objects
-    df['release_date'] = pd.to_datetime(df['release_date'], errors='coerce')
+    # TMDB always uses YYYY-MM-DD, and an explicit format takes pandas' fast parsing path
+    df['release_date'] = pd.to_datetime(df['release_date'], format='%Y-%m-%d', errors='coerce')
     
     # 6. Replace unrealistic values and convert to million USD
-    for col in ['budget', 'revenue', 'runtime']:
-        # Treat 0 as missing data (NaN)
-        df[col] = df[col].replace(0, pd.NA)
-        
-    # Convert budget and revenue to millions for easier reading
-    df['budget_musd'] = df['budget'] / 1_000_000
-    df['revenue_musd'] = df['revenue'] / 1000000
+    # Treat 0 as missing data (NaN), masking all three columns in one pass
+    zero_cols = ['budget', 'revenue', 'runtime']
+    df[zero_cols] = df[zero_cols].mask(df[zero_cols] == 0)
 
-    # Drop original budget and revenue columns as we have the MUSD versions
-    df = df.drop(columns=['budget', 'revenue'])
+    # Convert budget and revenue to millions for easier reading, and drop the
+    # original columns as we have the MUSD versions
+    df = df.assign(
+        budget_musd=df['budget'] / 1_000_000,
+        revenue_musd=df['revenue'] / 1_000_000,
+    ).drop(columns=['budget', 'revenue'])
         
     # If vote count is 0, set vote average to 0 to avoid misleading ratings
     if 'vote_count' in df.columns and 'vote_average' in df.columns:
         df.loc[df['vote_count'] == 0, 'vote_average'] = 0
     
     # Replace empty strings or 'No Data' with NaN in text columns
-    for col in ['overview', 'tagline']:
-        if col in df.columns:
-            df[col] = df[col].replace(['No Data', ''], pd.NA)
+    text_cols = [c for c in ['overview', 'tagline'] if c in df.columns]
+    df[text_cols] = df[text_cols].replace(['No Data', ''], pd.NA)
 
-    # 7. Remove duplicates and invalid rows
-    # Drop duplicate movies based on ID
-    df = df.drop_duplicates(subset='id')
+    # 7-9. Remove duplicates, invalid rows and unreleased movies
+    # All the row filters are combined into one mask so the frame is sliced only once
+    # Drop duplicate movies based on ID (keeping the first, as drop_duplicates would)
+    keep = ~df.duplicated(subset='id').to_numpy()
     # Drop rows where ID or title is missing
-    df = df.dropna(subset=['id', 'title'])
-    
-    # 8. Drop rows with too many missing values
-    # Keep rows that have at least 10 non-missing values
-    df = df.dropna(thresh=10)
-    
-    # 9. Filter to 'Released' movies only
+    keep &= df['id'].notna().to_numpy() & df['title'].notna().to_numpy()
+    # Drop rows with too many missing values: keep rows with at least 10 non-missing values
+    keep &= df.notna().sum(axis=1).to_numpy() >= 10
+    # Filter to 'Released' movies only
+    # (the status column itself is dropped by the final column selection)
     if 'status' in df.columns:
-        df = df[df['status'] == 'Released']
-        df = df.drop(columns=['status'])
-        
+        keep &= df['status'].eq('Released').to_numpy(dtype=bool, na_value=False)
+    df = df[keep]
+
     # 10. Reorder columns and extract credits info
     target_cols = [
         'id', 'title', 'tagline', 'release_date', 'genres', 'belongs_to_collection', 
@@ -103,71 +145,79 @@ def process_data(df) -> DataFrame:
     ]
     
     if 'credits' in df.columns:
-        # Helper function to extract director name
-        def get_director(x):
-            if isinstance(x, dict) and 'crew' in x:
-                for crew in x['crew']:
-                    if crew.get('job') == 'Director':
-                        return crew.get('name')
-            return ""
-            
-        # Helper function to extract top 5 cast members
-        def get_cast(x):
-            if isinstance(x, dict) and 'cast' in x:
-                return "|".join([c['name'] for c in x['cast'][:5]])
-            return ""
-            
-        df['director'] = df['credits'].apply(get_director)
-        df['cast'] = df['credits'].apply(get_cast)
-
-        # Calculate cast and crew sizes
-        df['cast_size'] = df['credits'].apply(lambda x: len(x.get('cast', [])) if isinstance(x, dict) else 0)
-        df['crew_size'] = df['credits'].apply(lambda x: len(x.get('crew', [])) if isinstance(x, dict) else 0)
+        # Helper function to extract the director, top 5 cast members and the
+        # cast and crew sizes, so each credits dict is only walked once
+        def parse_credits(x):
+            if not isinstance(x, dict):
+                return "", "", 0, 0
+            cast = x.get('cast', [])
+            crew = x.get('crew', [])
+            # Stop at the first crew member credited as Director
+            director = next((c.get('name') for c in crew if c.get('job') == 'Director'), "")
+            cast_names = "|".join([c['name'] for c in cast[:5]])
+            return director, cast_names, len(cast), len(crew)
+
+        credit_cols = ['director', 'cast', 'cast_size', 'crew_size']
+        parsed = [parse_credits(x) for x in df['credits'].to_numpy()]
+        df[credit_cols] = pd.DataFrame(parsed, index=df.index, columns=credit_cols)
         
         target_cols.extend(['cast', 'cast_size', 'director', 'crew_size'])
     
-    # Select only the columns we want to keep
+    # 11. Select the columns we want to keep, reset the index and calculate ROI/profit
+    # Everything is built in one assign() instead of column-by-column updates
     final_cols = [c for c in target_cols if c in df.columns]
-    df = df[final_cols]
-    
-    # 11. Reset index and calculate ROI/profit
-    df = df.reset_index(drop=True) # to clear fragments
-    
     # Fill NaN values in budget and revenue with 0 for calculations
-    df['budget_musd'] = df['budget_musd'].fillna(0)
-    df['revenue_musd'] = df['revenue_musd'].fillna(0)
-    
-    # Calculate ROI (Return on Investment) for each movie
-    def calculate_roi(row):
-        # If budget is greater than 0, calculate ROI as revenue / budget
-        # Otherwise return 0 to avoid division by zero
-        if row['budget_musd'] > 0:
-            return row['revenue_musd'] / row['budget_musd']
-        else:
-            return 0
-    
-    df['roi'] = df.apply(calculate_roi, axis=1)
-    # Calculate profit as revenue minus budget
-    df['profit'] = df['revenue_musd'] - df['budget_musd']
+    budget = df['budget_musd'].fillna(0).to_numpy(dtype=float)
+    revenue = df['revenue_musd'].fillna(0).to_numpy(dtype=float)
+    df = df[final_cols].reset_index(drop=True).assign(
+        budget_musd=budget,
+        revenue_musd=revenue,
+        # ROI (Return on Investment) is revenue / budget, or 0 when there is no budget
+        roi=np.divide(revenue, budget, out=np.zeros_like(revenue), where=budget > 0),
+        # Profit is revenue minus budget
+        profit=revenue - budget,
+    )
     
     return df
 
 def save_processed_data(df, filename="data/processed/movies_cleaned.csv"):
-    """Saves processed dataframe to CSV."""
+    """
+    Saves processed dataframe to CSV, or to Parquet if the filename ends in .parquet.
+
+    Parquet is smaller and faster to read back, and it keeps the column types.
+    """
     filepath = Path(filename)
     # Create parent directories if they don't exist
     filepath.parent.mkdir(parents=True, exist_ok=True)
-    # Save to CSV without the index
-    df.to_csv(filepath, index=False)
+    # Save without the index
+    if filepath.suffix == '.parquet':
+        df.to_parquet(filepath, engine='pyarrow', compression='zstd', index=False)
+    else:
+        df.to_csv(filepath, index=False)
     print(f"Saved processed data to {filepath}")
 
+def find_processed_data(data_format='csv'):
+    """
+    Returns the path of the processed data file to read.
+
+    The most recently written processed file is used, whichever its format,
+    so the pipeline and the standalone scripts always read the newest data
+    (a file in data_format wins a tie). If no processed file exists yet, the
+    path for data_format is returned.
+    """
+    preferred = PROCESSED_DATA_PATHS[data_format]
+    existing = [path for path in PROCESSED_DATA_PATHS.values() if path.exists()]
+    if not existing:
+        return preferred
+    return max(existing, key=lambda path: (path.stat().st_mtime, path == preferred))
+
 
 if __name__ == "__main__":
     print("Loading raw data...")
     df: DataFrame = load_raw_data()
     
     print("Processing data...")
-    df_clean: DataFrame = process_data(df)
+    df_clean: DataFrame = process_data(df, verbose=True)
     
     print("Saving processed data...")
     save_processed_data(df_clean)
@@ -1,96 +1,190 @@
+import numpy as np
 import pandas as pd
+import matplotlib
+# The charts are only ever saved to files, so use the non-interactive Agg
+# backend and never start a GUI toolkit (this must happen before importing pyplot)
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.cbook import boxplot_stats
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# The analysis loader already parses dates and derives release_year/is_franchise
+from analysis import aggregate_groups, load_processed_data, one_hot_names
 
-def load_processed_data(filename="data/processed/movies_cleaned.csv"):
-    """Loads the cleaned movie data for visualization."""
-    filepath = Path(filename)
-    if not filepath.exists():
-        raise FileNotFoundError(f"{filename} not found. Please run process_data.py first.")
+# Set the visual style for plots once, when the module is imported (worker
+# processes import it too, so they pick up the same style)
+sns.set_theme(style="whitegrid")
 
-    df = pd.read_csv(filepath)
-    # Convert release_date to datetime
-    df['release_date'] = pd.to_datetime(df['release_date'])
-    # Extract year for yearly trend analysis
-    df['release_year'] = df['release_date'].dt.year
-    # Handle missing values in 'belongs_to_collection'
-    df['belongs_to_collection'] = df['belongs_to_collection'].fillna('')
-    # Create a boolean flag for franchise movies
-    df['is_franchise'] = df['belongs_to_collection'].apply(lambda x: True if x else False)
-    return df
 
+# Above this many movies the scatter plots switch to a hexbin density plot, which
+# bins every point in one pass instead of drawing a separate marker per movie
+DENSITY_PLOT_THRESHOLD = 20_000
 
-def plot_revenue_vs_budget(df, output_dir):
+# Columns the charts use, so the loader can skip everything else
+VISUALIZATION_COLUMNS = [
+    'genres', 'budget_musd', 'revenue_musd', 'vote_average', 'popularity',
+    'roi', 'release_year', 'is_franchise',
+]
+
+# savefig options for each supported image format. PNGs use fast (level 1)
+# compression: they are written much more quickly, for slightly larger files.
+# WebP files are smaller still, and SVG suits charts with few shapes.
+IMAGE_OPTIONS = {
+    'png': {'pil_kwargs': {'compress_level': 1}},
+    'webp': {'pil_kwargs': {'quality': 80, 'method': 4}},
+    'svg': {},
+}
+
+
+def new_axes(fig, figsize):
+    """
+    Returns empty Axes of the given size to draw a plot on.
+
+    A Figure that is passed in is cleared and resized so it can be reused;
+    otherwise a new Figure is created.
+    """
+    if fig is None:
+        fig = plt.figure(figsize=figsize)
+    else:
+        # clf() also removes a colorbar left over from the previous plot
+        fig.clf()
+        fig.set_size_inches(figsize)
+    return fig.add_subplot()
+
+
+def save_plot(ax, path, fig=None, image_format='png'):
+    """
+    Saves the figure holding ax to path, with the image format as its extension.
+
+    The figure is closed afterwards unless it is a reused Figure.
+    """
+    ax.figure.savefig(path.with_suffix(f'.{image_format}'), **IMAGE_OPTIONS[image_format])
+    if fig is None:
+        plt.close(ax.figure)
+
+
+def plot_points(ax, df, x, y, hue=None, hue_labels=None, alpha=0.7):
+    """
+    Draws a scatter plot, or a hexbin density plot for very large datasets.
+
+    Points are coloured by the values of the hue column, which are named in the
+    legend through the optional hue_labels mapping.
+    """
+    if len(df) > DENSITY_PLOT_THRESHOLD:
+        # Colour shows how many movies fall in each cell (hue is dropped at this size)
+        cells = ax.hexbin(df[x], df[y], gridsize=80, mincnt=1, bins='log', cmap='viridis')
+        ax.figure.colorbar(cells, ax=ax, label='Number of movies')
+        return
+
+    # Pass NumPy arrays straight to ax.scatter, skipping seaborn's DataFrame handling
+    x_values = df[x].to_numpy(dtype=float)
+    y_values = df[y].to_numpy(dtype=float)
+    # White marker edges, as seaborn's scatterplot draws them. Rasterize the markers
+    # so they are stored as one image rather than one vector path per movie
+    # (this matters for vector formats such as SVG/PDF)
+    style = dict(alpha=alpha, edgecolor='w', linewidth=0.5, rasterized=True)
+    if hue is None:
+        ax.scatter(x_values, y_values, **style)
+        return
+
+    # One scatter call per group; each takes the next colour of the palette
+    hue_values = df[hue].to_numpy()
+    for value in np.unique(hue_values):
+        group = hue_values == value
+        label = hue_labels.get(value, value) if hue_labels else value
+        ax.scatter(x_values[group], y_values[group], label=label, **style)
+    ax.legend()
+
+
+def plot_revenue_vs_budget(df, output_dir, fig=None, image_format='png'):
     """Creates a scatter plot showing the relationship between budget and revenue."""
-    plt.figure(figsize=(10, 6))
+    ax = new_axes(fig, (10, 6))
     # Scatter plot with different colors for franchise vs standalone movies
-    sns.scatterplot(data=df, x='budget_musd', y='revenue_musd', hue='is_franchise', alpha=0.7)
-    plt.title('Revenue vs Budget')
-    plt.xlabel('Budget (MUSD)')
-    plt.ylabel('Revenue (MUSD)')
+    plot_points(
+        ax, df, 'budget_musd', 'revenue_musd',
+        hue='is_franchise', hue_labels={False: 'Standalone', True: 'Franchise'}, alpha=0.7,
+    )
+    ax.set_title('Revenue vs Budget')
+    ax.set_xlabel('Budget (MUSD)')
+    ax.set_ylabel('Revenue (MUSD)')
     # Save the plot to the output directory
-    plt.savefig(output_dir / 'revenue_vs_budget.png')
-    plt.close()
+    save_plot(ax, output_dir / 'revenue_vs_budget', fig, image_format)
 
 
-def plot_roi_by_genre(df, output_dir):
+def plot_roi_by_genre(df, output_dir, fig=None, image_format='png'):
     """Creates a box plot of ROI distribution for the top 5 genres."""
-    # Explode the genres column so each genre gets its own row
-    df_genres = df.assign(genre=df['genres'].str.split('|')).explode('genre')
+    # One bool column per genre, so counting and selecting genres needs no exploded copy
+    genre_flags = one_hot_names(df, 'genres')
     # Identify the top 5 most common genres
-    top_genres = df_genres['genre'].value_counts().head(5).index
-    # Filter data to include only these top genres
-    df_top_genres = df_genres[df_genres['genre'].isin(top_genres)]
-
-    plt.figure(figsize=(12, 6))
-    # Create box plot to show distribution of ROI
-    sns.boxplot(data=df_top_genres, x='genre', y='roi')
-    plt.title('ROI Distribution by Top 5 Genres')
+    top_genres = genre_flags.sum().nlargest(5).index
+    # Compute the box plot statistics (quartiles, whiskers, outliers) for each
+    # top genre straight from the ROI array, without a long-form DataFrame
+    roi = df['roi'].to_numpy(dtype=float)
+    stats = []
+    for genre in top_genres:
+        values = roi[genre_flags[genre].to_numpy()]
+        stats.extend(boxplot_stats(values[~np.isnan(values)], labels=[genre]))
+
+    ax = new_axes(fig, (12, 6))
+    # Draw the boxes from the precomputed statistics, styled like seaborn's boxplot
+    line = dict(color='0.25')
+    ax.bxp(
+        stats, widths=0.8, patch_artist=True,
+        boxprops=dict(facecolor=sns.desaturate('C0', 0.75), edgecolor='0.25'),
+        medianprops=line, whiskerprops=line, capprops=line,
+        flierprops=dict(marker='o', markerfacecolor='none', markeredgecolor='0.25'),
+    )
+    ax.grid(False, axis='x')
+    ax.set_title('ROI Distribution by Top 5 Genres')
+    ax.set_xlabel('genre')
+    ax.set_ylabel('roi')
     # Limit y-axis to focus on the main distribution, excluding extreme outliers
-    plt.ylim(-1, 10)
-    plt.savefig(output_dir / 'roi_by_genre.png')
-    plt.close()
+    ax.set_ylim(-1, 10)
+    save_plot(ax, output_dir / 'roi_by_genre', fig, image_format)
 
 
-def plot_popularity_vs_rating(df, output_dir):
+def plot_popularity_vs_rating(df, output_dir, fig=None, image_format='png'):
     """Creates a scatter plot of popularity vs vote average."""
-    plt.figure(figsize=(10, 6))
-    sns.scatterplot(data=df, x='vote_average', y='popularity', alpha=0.6)
-    plt.title('Popularity vs Rating')
-    plt.xlabel('Vote Average')
-    plt.ylabel('Popularity')
-    plt.savefig(output_dir / 'popularity_vs_rating.png')
-    plt.close()
+    ax = new_axes(fig, (10, 6))
+    plot_points(ax, df, 'vote_average', 'popularity', alpha=0.6)
+    ax.set_title('Popularity vs Rating')
+    ax.set_xlabel('Vote Average')
+    ax.set_ylabel('Popularity')
+    save_plot(ax, output_dir / 'popularity_vs_rating', fig, image_format)
 
 
-def plot_yearly_trends(df, output_dir):
+def plot_yearly_trends(df, output_dir, fig=None, image_format='png'):
     """Creates a line plot showing total revenue over the years."""
-    # Group by year and sum the revenue
-    yearly_stats = df.groupby('release_year')['revenue_musd'].sum().reset_index()
+    # Sum the revenue per year: rows are sorted by year once and each year's run is
+    # summed with np.add.reduceat (the same helper the analysis uses for its groups)
+    yearly_stats = aggregate_groups(df, 'release_year', revenue_musd=('revenue_musd', 'sum')).reset_index()
 
-    plt.figure(figsize=(12, 6))
-    sns.lineplot(data=yearly_stats, x='release_year', y='revenue_musd', marker='o')
-    plt.title('Yearly Trends in Box Office Revenue')
-    plt.xlabel('Year')
-    plt.ylabel('Total Revenue (MUSD)')
-    plt.savefig(output_dir / 'yearly_trends.png')
-    plt.close()
+    ax = new_axes(fig, (12, 6))
+    sns.lineplot(data=yearly_stats, x='release_year', y='revenue_musd', marker='o', ax=ax)
+    ax.set_title('Yearly Trends in Box Office Revenue')
+    ax.set_xlabel('Year')
+    ax.set_ylabel('Total Revenue (MUSD)')
+    save_plot(ax, output_dir / 'yearly_trends', fig, image_format)
 
 
-def plot_franchise_vs_standalone(df, output_dir):
+def plot_franchise_vs_standalone(df, output_dir, fig=None, image_format='png'):
     """Creates a bar chart comparing average revenue and budget for franchise vs standalone movies."""
     # Calculate average revenue and budget for each group
-    franchise_stats = df.groupby('is_franchise').agg({
-        'revenue_musd': 'mean',
-        'budget_musd': 'mean'
-    }).reset_index()
-
-    # Rename boolean values to readable labels
-    franchise_stats['is_franchise'] = franchise_stats['is_franchise'].map({
-        True: 'Franchise',
-        False: 'Standalone'
+    # With only two groups, a boolean mask is cheaper than a groupby
+    is_franchise = df['is_franchise'].to_numpy(dtype=bool)
+    groups = {'Standalone': ~is_franchise, 'Franchise': is_franchise}
+
+    def group_means(col):
+        values = df[col].to_numpy(dtype=float)
+        # An empty group has no mean (groupby would leave it out altogether)
+        return [np.nanmean(values[mask]) if mask.any() else np.nan for mask in groups.values()]
+
+    franchise_stats = pd.DataFrame({
+        'is_franchise': list(groups),
+        'revenue_musd': group_means('revenue_musd'),
+        'budget_musd': group_means('budget_musd'),
     })
 
     # Reshape data for plotting with seaborn
@@ -101,30 +195,71 @@ def plot_franchise_vs_standalone(df, output_dir):
         value_name='Value (MUSD)'
     )
 
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=franchise_melt, x='Metric', y='Value (MUSD)', hue='is_franchise', hue_order=['Standalone', 'Franchise'])
-    plt.title('Franchise vs Standalone: Revenue & Budget')
-    plt.savefig(output_dir / 'franchise_vs_standalone.png')
-    plt.close()
+    ax = new_axes(fig, (10, 6))
+    sns.barplot(data=franchise_melt, x='Metric', y='Value (MUSD)', hue='is_franchise', hue_order=['Standalone', 'Franchise'], ax=ax)
+    ax.set_title('Franchise vs Standalone: Revenue & Budget')
+    save_plot(ax, output_dir / 'franchise_vs_standalone', fig, image_format)
+
+
+# Every chart create_all_visualizations draws, in order
+PLOTS = [
+    plot_revenue_vs_budget,
+    plot_roi_by_genre,
+    plot_popularity_vs_rating,
+    plot_yearly_trends,
+    plot_franchise_vs_standalone,
+]
+
+# The movies each worker process plots, set once by init_plot_worker
+worker_df = None
+
 
+def init_plot_worker(df):
+    """Receives the movie data once per worker process instead of once per chart."""
+    global worker_df
+    worker_df = df
 
-def create_all_visualizations(df):
-    """Generates and saves all visualizations."""
-    # Set the visual style for plots
-    sns.set_theme(style="whitegrid")
+
+def run_plot_worker(plot, output_dir, image_format):
+    """Draws one chart in a worker process."""
+    plot(worker_df, output_dir, image_format=image_format)
+
+
+def create_all_visualizations(df, workers=1, image_format='png'):
+    """
+    Generates and saves all visualizations.
+
+    image_format picks the file type of the charts: 'png', 'webp' or 'svg'.
+
+    With workers > 1 the charts are drawn in parallel worker processes, each
+    with its own matplotlib state. This pays off for large datasets, where
+    rendering takes longer than starting the processes.
+    """
+    # No interactive redraws while the charts are being built
+    plt.ioff()
 
     output_dir = Path('data/processed')
     # Ensure the output directory exists
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Generate each plot
-    plot_revenue_vs_budget(df, output_dir)
-    plot_roi_by_genre(df, output_dir)
-    plot_popularity_vs_rating(df, output_dir)
-    plot_yearly_trends(df, output_dir)
-    plot_franchise_vs_standalone(df, output_dir)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_plot_worker, initargs=(df,)) as executor:
+            # list() waits for every chart and re-raises any error from a worker
+            list(executor.map(run_plot_worker, PLOTS, [output_dir] * len(PLOTS), [image_format] * len(PLOTS)))
+        return
+
+    # Generate each plot on one shared Figure, which is cleared between plots,
+    # instead of setting up a new Figure and renderer for every chart
+    fig = plt.figure()
+    try:
+        for plot in PLOTS:
+            plot(df, output_dir, fig, image_format)
+    finally:
+        plt.close(fig)
 
 
 if __name__ == "__main__":
-    df = load_processed_data()
+    from process_data import find_processed_data
+
+    df = load_processed_data(find_processed_data(), columns=VISUALIZATION_COLUMNS)
     create_all_visualizations(df)